@@ -7,21 +7,26 @@ from contextlib import asynccontextmanager
 from dataclasses import dataclass
 
 import betterlogging as bl
+import uvloop
 from aiogram import Bot, Dispatcher
-from aiogram.client.session.aiohttp import AiohttpSession
 from aiogram.client.telegram import TelegramAPIServer
 from aiogram.fsm.storage.redis import DefaultKeyBuilder, RedisStorage
 from aiogram.webhook.aiohttp_server import SimpleRequestHandler, setup_application
 from aiohttp import web
 from redis import asyncio as aioredis
+from sqlalchemy.ext.asyncio import AsyncEngine, AsyncSession, async_sessionmaker
 
 from tgbot.config import Config, load_config
+from tgbot.database.orm import AsyncORM
 from tgbot.handlers import routers_list
+from tgbot.keyboards.inline import static_markups
+from tgbot.keyboards.reply import main_menu
 from tgbot.middlewares.config import ConfigMiddleware
 from tgbot.middlewares.database import DatabaseMiddleware
 from tgbot.middlewares.dev import DeveloperMiddleware
 from tgbot.services import broadcaster
 from tgbot.services.migration import init_db_and_migrations
+from tgbot.services.session import CachedMarkupSession
 
 
 @dataclass
@@ -41,6 +46,7 @@ class TgBot:
         self.bot: Optional[Bot] = None
         self.dp: Optional[Dispatcher] = None
         self.redis: Optional[aioredis.Redis] = None
+        self.engine: Optional[AsyncEngine] = None
         self.app: Optional[web.Application] = None
         self.logger = logging.getLogger(__name__)
         self._setup_logging()
@@ -57,8 +63,14 @@ class TgBot:
     async def _init_storage(self) -> RedisStorage:
         """Initializing Redis storage"""
         try:
-            return RedisStorage.from_url(
+            # hiredis is picked up as the response parser automatically when installed
+            pool = aioredis.ConnectionPool.from_url(
                 self.config.redis.dsn(),
+                max_connections=self.config.redis.max_connections,
+            )
+            self.redis = aioredis.Redis(connection_pool=pool)
+            return RedisStorage(
+                redis=self.redis,
                 key_builder=DefaultKeyBuilder(with_bot_id=True, with_destiny=True),
             )
         except Exception as e:
@@ -68,14 +80,20 @@ class TgBot:
     async def _init_database(self) -> None:
         """Initializing database"""
         try:
-            db_url = (
-                f"postgresql+asyncpg://{self.config.postgres.db_user}:{self.config.postgres.db_pass}"
-                f"@{self.config.postgres.db_host}:5432/{self.config.postgres.db_name}"
-            )
-            await init_db_and_migrations(
-                database_url=db_url,
+            self.engine = await init_db_and_migrations(
+                database_url=self.config.postgres.asyncpg_dsn,
                 alembic_cfg_path=str(Path(__file__).parent / "alembic.ini"),
+                pool_size=self.config.postgres.pool_size,
+                max_overflow=self.config.postgres.max_overflow,
+                pool_timeout=self.config.postgres.pool_timeout,
+                pool_recycle=self.config.postgres.pool_recycle,
+            )
+            AsyncORM.set_session_factory(
+                async_sessionmaker(
+                    self.engine, class_=AsyncSession, expire_on_commit=False
+                )
             )
+            AsyncORM.init_models()
         except Exception as e:
             self.logger.error(f"Database initialization failed: {e}")
             raise
@@ -84,7 +102,11 @@ class TgBot:
         """Bot setup"""
         try:
             storage = await self._init_storage()
-            session = AiohttpSession(api=TelegramAPIServer.from_base("http://nginx:80"))
+            AsyncORM.set_redis(self.redis)
+            session = CachedMarkupSession(
+                api=TelegramAPIServer.from_base("http://nginx:80"),
+                static_markups=(*static_markups, main_menu),
+            )
 
             self.bot = Bot(
                 token=self.config.tg_bot.token, parse_mode="HTML", session=session
@@ -100,16 +122,13 @@ class TgBot:
             raise
 
     def _register_middlewares(self) -> None:
-        """Register middlewares"""
-        middleware_types = [
+        """Register middlewares once per update, at the top-level observer"""
+        for middleware in (
             ConfigMiddleware(self.config, self.redis),
             DatabaseMiddleware(),
             DeveloperMiddleware(),
-        ]
-
-        for middleware in middleware_types:
-            for event_type in [self.dp.message, self.dp.callback_query]:
-                event_type.outer_middleware(middleware)
+        ):
+            self.dp.update.outer_middleware(middleware)
 
     async def setup_webhook(self) -> None:
         """Webhook setup with validation"""
@@ -123,6 +142,13 @@ class TgBot:
         webhook_handler.register(self.app, path=self.webhook_config.path)
         setup_application(self.app, self.dp, bot=self.bot)
 
+    async def _notify_admins(self, text: str) -> None:
+        """Broadcast to admins, never letting a failed notification stop the bot"""
+        try:
+            await broadcaster.broadcast(self.bot, self.config.tg_bot.admin_ids, text)
+        except Exception as e:
+            self.logger.error(f"Failed to notify admins: {e}")
+
     @asynccontextmanager
     async def bot_context(self):
         """Context manager for starting and shutting down the bot"""
@@ -135,10 +161,7 @@ class TgBot:
             await self.bot.delete_webhook()
             await self.bot.set_webhook(self.webhook_config.webhook_url)
 
-            # Notify admins
-            await broadcaster.broadcast(
-                self.bot, self.config.tg_bot.admin_ids, "Bot started successfully"
-            )
+            await self._notify_admins("Bot started successfully")
 
             yield
 
@@ -151,35 +174,35 @@ class TgBot:
             self.logger.info(f"Received exit signal {signal.name}")
 
         try:
-            # Notify admins
             if self.bot:
-                await broadcaster.broadcast(
-                    self.bot, self.config.tg_bot.admin_ids, "Bot is shutting down..."
-                )
+                await self._notify_admins("Bot is shutting down...")
 
             # Close all connections
             if self.bot:
                 await self.bot.session.close()
             if self.redis:
-                await self.redis.close()
+                await self.redis.aclose(close_connection_pool=True)
+            if self.engine:
+                await self.engine.dispose()
 
             self.logger.info("Shutdown completed successfully")
 
         except Exception as e:
             self.logger.error(f"Error during shutdown: {e}")
         finally:
-            asyncio.get_event_loop().stop()
+            asyncio.get_running_loop().stop()
 
     async def start(self) -> None:
         """Bot start"""
+        # Setup signals handler
+        loop = asyncio.get_running_loop()
+        for sig in (signal.SIGTERM, signal.SIGINT):
+            loop.add_signal_handler(
+                sig, lambda s=sig: loop.create_task(self.shutdown(s))
+            )
+
         async with self.bot_context():
             try:
-                # Setup signals handler
-                for sig in (signal.SIGTERM, signal.SIGINT):
-                    asyncio.get_event_loop().add_signal_handler(
-                        sig, lambda s=sig: asyncio.create_task(self.shutdown(s))
-                    )
-
                 # Start web-server
                 runner = web.AppRunner(self.app)
                 await runner.setup()
@@ -203,6 +226,7 @@ def main():
     try:
         config = load_config(".env")
         bot = TgBot(config)
+        asyncio.set_event_loop_policy(uvloop.EventLoopPolicy())
         asyncio.run(bot.start())
     except Exception as e:
         logging.error(f"Failed to start bot: {e}")
@@ -20,11 +20,7 @@ config = context.config
 sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.dirname(__file__))))
 
 my_config = load_config()
-config.set_main_option(
-    "sqlalchemy.url",
-    f"postgresql+asyncpg://{my_config.postgres.db_user}:{my_config.postgres.db_pass}"
-    f"@{my_config.postgres.db_host}:5432/{my_config.postgres.db_name}",
-)
+config.set_main_option("sqlalchemy.url", my_config.postgres.asyncpg_dsn)
 
 
 # config.set_main_option(
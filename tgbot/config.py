@@ -1,4 +1,5 @@
 from dataclasses import dataclass
+from functools import cached_property
 from typing import Optional
 
 from environs import Env
@@ -22,6 +23,17 @@ class Postgres:
     db_user: str
     db_pass: str
     db_host: str
+    pool_size: int = 20
+    max_overflow: int = 10
+    pool_timeout: int = 30
+    pool_recycle: int = 1800
+
+    @cached_property
+    def asyncpg_dsn(self) -> str:
+        return (
+            f"postgresql+asyncpg://{self.db_user}:{self.db_pass}"
+            f"@{self.db_host}:5432/{self.db_name}"
+        )
 
     @staticmethod
     def from_env(env: Env):
@@ -29,8 +41,19 @@ class Postgres:
         db_user = env.str("POSTGRES_USER")
         db_pass = env.str("POSTGRES_PASSWORD")
         db_host = env.str("POSTGRES_HOST")
+        pool_size = env.int("POSTGRES_POOL_SIZE", 20)
+        max_overflow = env.int("POSTGRES_MAX_OVERFLOW", 10)
+        pool_timeout = env.int("POSTGRES_POOL_TIMEOUT", 30)
+        pool_recycle = env.int("POSTGRES_POOL_RECYCLE", 1800)
         return Postgres(
-            db_name=db_name, db_user=db_user, db_pass=db_pass, db_host=db_host
+            db_name=db_name,
+            db_user=db_user,
+            db_pass=db_pass,
+            db_host=db_host,
+            pool_size=pool_size,
+            max_overflow=max_overflow,
+            pool_timeout=pool_timeout,
+            pool_recycle=pool_recycle,
         )
 
 
@@ -39,6 +62,7 @@ class Redis:
     redis_pass: Optional[str]
     redis_port: Optional[int]
     redis_host: Optional[str]
+    max_connections: int = 50
 
     def dsn(self, database_num: int = 0) -> str:
         if self.redis_pass:
@@ -51,11 +75,13 @@ class Redis:
         redis_pass = env.str("REDIS_PASSWORD")
         redis_port = env.int("REDIS_PORT")
         redis_host = env.str("REDIS_HOST")
+        max_connections = env.int("REDIS_MAX_CONNECTIONS", 50)
 
         return Redis(
             redis_pass=redis_pass,
             redis_port=redis_port,
             redis_host=redis_host,
+            max_connections=max_connections,
         )
 
 
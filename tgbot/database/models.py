@@ -12,7 +12,9 @@ created_at = Annotated[
 
 class User(Base):
     __tablename__ = "users"
+    __mapper_args__ = {"eager_defaults": True}
 
     id: Mapped[int] = mapped_column(BigInteger, primary_key=True)
     username: Mapped[str] = mapped_column(unique=True)
     registered_at: Mapped[created_at]
+    blocked: Mapped[bool] = mapped_column(default=False, server_default=text("false"))
@@ -1,7 +1,22 @@
-from typing import Generic, List, Type, TypeVar
-from sqlalchemy import and_, desc, select
+import json
+from contextlib import asynccontextmanager
+from typing import AsyncIterator, Generic, List, Optional, Tuple, Type, TypeVar
+from sqlalchemy import (
+    BigInteger,
+    Select,
+    any_,
+    bindparam,
+    delete,
+    desc,
+    func,
+    select,
+    update,
+)
+from sqlalchemy.dialects.postgresql import ARRAY
 from sqlalchemy.orm import joinedload, sessionmaker
 from sqlalchemy.exc import NoResultFound
+from sqlalchemy.ext.asyncio import AsyncSession
+from redis import asyncio as aioredis
 from tgbot.database.database import Base
 
 from .models import User
@@ -13,17 +28,70 @@ class CRUDBase(Generic[T]):
     def __init__(self, model: Type[T], session_factory: sessionmaker):
         self.model = model
         self.session_factory = session_factory
+        self._statements: dict[tuple, Select] = {}
 
-    async def create(self, **kwargs) -> T:
+    def _filtered_statement(self, kind: str, kwargs: dict) -> Tuple[Select, dict]:
+        """
+        Statement for `kind` ("all" or "count") filtered by the keys of `kwargs`,
+        with the bind parameters to execute it with.
+
+        Built once per set of filter keys; values are passed as bind parameters on execute.
+        None values compile to IS NULL, so they are part of the key and not bound.
+        """
+        cache_key = (kind,) + tuple(
+            (key, isinstance(value, (tuple, list)), value is None)
+            for key, value in kwargs.items()
+        )
+        params = {key: value for key, value in kwargs.items() if value is not None}
+        query = self._statements.get(cache_key)
+        if query is not None:
+            return query, params
+
+        filters = []
+        for key, value in kwargs.items():
+            column = getattr(self.model, key)
+            if value is None:
+                filters.append(column.is_(None))
+            elif isinstance(value, (tuple, list)):
+                filters.append(column.in_(bindparam(key, expanding=True)))
+            else:
+                filters.append(column == bindparam(key))
+
+        if kind == "count":
+            query = select(func.count()).select_from(self.model).filter(*filters)
+        else:
+            query = (
+                select(self.model).filter(*filters).order_by(desc(self.model.id))
+            )
+        self._statements[cache_key] = query
+        return query, params
+
+    @asynccontextmanager
+    async def _get_read_session(self) -> AsyncIterator[AsyncSession]:
+        """Session in autocommit mode, no BEGIN/COMMIT around single reads"""
         async with self.session_factory() as session:
+            await session.connection(
+                execution_options={"isolation_level": "AUTOCOMMIT"}
+            )
+            yield session
+
+    @asynccontextmanager
+    async def _get_write_session(self) -> AsyncIterator[AsyncSession]:
+        """Session wrapped in a transaction, committed on exit"""
+        async with self.session_factory() as session:
+            async with session.begin():
+                yield session
+
+    async def create(self, **kwargs) -> T:
+        async with self._get_write_session() as session:
             obj = self.model(**kwargs)
             session.add(obj)
-            await session.commit()
-            await session.refresh(obj)
+            # eager_defaults fetches server defaults via INSERT ... RETURNING
+            await session.flush()
             return obj
 
     async def get(self, id: int) -> T:
-        async with self.session_factory() as session:
+        async with self._get_read_session() as session:
             query = select(self.model).filter_by(id=id)
             result = await session.execute(query)
             try:
@@ -32,61 +100,153 @@ class CRUDBase(Generic[T]):
                 return None
 
     async def get_all(self, **kwargs) -> List[T]:
-        async with self.session_factory() as session:
-            filters = []
-            for key, value in kwargs.items():
-                if isinstance(value, (tuple, list)):
-                    filters.append(getattr(self.model, key).in_(value))
-                else:
-                    filters.append(getattr(self.model, key) == value)
+        async with self._get_read_session() as session:
+            query, params = self._filtered_statement("all", kwargs)
+            result = await session.execute(query, params)
+            return result.scalars().all()
+
+    async def stream(self, chunk_size: int = 1000, **kwargs) -> AsyncIterator[T]:
+        """
+        Yield rows one by one, fetching them from a server-side cursor in chunks
 
+        The session and cursor stay open until the generator is exhausted or closed,
+        so a consumer that may stop early must close it, e.g. with
+        `async with contextlib.aclosing(repo.stream()) as rows:`.
+        """
+        # Server-side cursors need a transaction, so no autocommit read session here
+        async with self.session_factory() as session:
             query = (
-                select(self.model).filter(and_(*filters)).order_by(desc(self.model.id))
+                select(self.model)
+                .filter_by(**kwargs)
+                .execution_options(yield_per=chunk_size)
             )
-            result = await session.execute(query)
-            return result.scalars().all()
+            result = await session.stream_scalars(query)
+            try:
+                async for obj in result:
+                    yield obj
+            finally:
+                await result.close()
 
     async def update(self, id: int, **kwargs) -> T | None:
-        async with self.session_factory() as session:
-            query = select(self.model).filter_by(id=id)
+        # An UPDATE without a SET clause is invalid SQL, nothing to change anyway
+        if not kwargs:
+            return await self.get(id)
+        async with self._get_write_session() as session:
+            query = (
+                update(self.model)
+                .where(self.model.id == id)
+                .values(**kwargs)
+                .returning(self.model)
+            )
             result = await session.execute(query)
-            try:
-                obj = result.scalars().one()
-                for key, value in kwargs.items():
-                    setattr(obj, key, value)
+            return result.scalar_one_or_none()
 
-                await session.commit()
-                await session.refresh(obj)
-                return obj
-            except NoResultFound:
-                return None
+    async def update_all(self, filters: dict, **values) -> List[T]:
+        """Bulk UPDATE of all rows matching `filters`, done in a single statement"""
+        if not values:
+            return await self.get_all(**filters)
+        async with self._get_write_session() as session:
+            query = (
+                update(self.model)
+                .filter_by(**filters)
+                .values(**values)
+                .returning(self.model)
+                .execution_options(synchronize_session=False)
+            )
+            result = await session.execute(query)
+            return list(result.scalars().all())
 
     async def delete(self, id: int) -> bool:
-        async with self.session_factory() as session:
-            query = select(self.model).filter_by(id=id)
+        async with self._get_write_session() as session:
+            query = (
+                delete(self.model).where(self.model.id == id).returning(self.model.id)
+            )
             result = await session.execute(query)
-            try:
-                obj = result.scalars().one()
-                await session.delete(obj)
-                await session.commit()
-                return True
-            except NoResultFound:
-                return False
+            return result.scalar_one_or_none() is not None
 
     async def count(self, **kwargs) -> int:
-        async with self.session_factory() as session:
-            query = select(self.model).filter_by(**kwargs)
-            result = await session.execute(query)
-            return len(result.scalars().all())
+        async with self._get_read_session() as session:
+            query, params = self._filtered_statement("count", kwargs)
+            result = await session.execute(query, params)
+            return result.scalar_one()
 
 
 class UsersRepo(CRUDBase[User]):
-    def __init__(self, session):
+    ids_cache_key = "users:ids"
+    ids_cache_ttl = 600
+    ids_version_key = "users:ids:version"
+
+    def __init__(self, session, redis: Optional[aioredis.Redis] = None):
         super().__init__(User, session)
+        self.redis = redis
+
+    async def get_all_ids(self) -> List[int]:
+        """Ids of all users that haven't blocked the bot, served from Redis when cached"""
+        key = None
+        if self.redis:
+            # Invalidation bumps the version, so a fill that raced with it
+            # lands under an old key nobody reads instead of serving stale ids
+            version = int(await self.redis.get(self.ids_version_key) or 0)
+            key = f"{self.ids_cache_key}:{version}"
+            cached = await self.redis.get(key)
+            if cached is not None:
+                return json.loads(cached)
+
+        ids = await self.get_all_ids_fast()
+
+        if key:
+            await self.redis.set(key, json.dumps(ids), ex=self.ids_cache_ttl)
+        return ids
+
+    async def get_all_ids_fast(self) -> List[int]:
+        """Ids of users that haven't blocked the bot, straight from asyncpg"""
+        async with self._get_read_session() as session:
+            connection = await session.connection()
+            raw_connection = await connection.get_raw_connection()
+            rows = await raw_connection.driver_connection.fetch(
+                f"SELECT id FROM {User.__tablename__} WHERE NOT blocked"
+            )
+            return [row[0] for row in rows]
+
+    async def mark_blocked(self, ids: List[int]) -> None:
+        """Flag users that blocked the bot so broadcasts skip them"""
+        if not ids:
+            return
+        async with self._get_write_session() as session:
+            await session.execute(
+                # One array parameter, asyncpg caps a query at 32767 arguments
+                update(User)
+                .where(User.id == any_(bindparam("ids", type_=ARRAY(BigInteger))))
+                .values(blocked=True),
+                {"ids": ids},
+            )
+        await self._invalidate_ids()
+
+    async def _invalidate_ids(self) -> None:
+        if self.redis:
+            await self.redis.incr(self.ids_version_key)
+
+    async def create(self, **kwargs) -> User:
+        obj = await super().create(**kwargs)
+        await self._invalidate_ids()
+        return obj
+
+    async def update(self, id: int, **kwargs) -> User | None:
+        obj = await super().update(id, **kwargs)
+        if obj and "blocked" in kwargs:
+            await self._invalidate_ids()
+        return obj
+
+    async def delete(self, id: int) -> bool:
+        deleted = await super().delete(id)
+        if deleted:
+            await self._invalidate_ids()
+        return deleted
 
 
 class AsyncORM:
     session_factory: sessionmaker
+    redis: Optional[aioredis.Redis] = None
 
     # models
     users: UsersRepo
@@ -95,6 +255,11 @@ class AsyncORM:
     def set_session_factory(cls, session_factory):
         cls.session_factory = session_factory
 
+    @classmethod
+    def set_redis(cls, redis: aioredis.Redis):
+        cls.redis = redis
+        cls.users.redis = redis
+
     @classmethod
     def init_models(cls):
-        cls.users = UsersRepo(cls.session_factory)
+        cls.users = UsersRepo(cls.session_factory, cls.redis)
@@ -1,6 +1,8 @@
 import asyncio
+from contextlib import suppress
 
-from aiogram import F, Router
+from aiogram import F, Router, html
+from aiogram.exceptions import TelegramBadRequest
 from aiogram.filters import Command
 from aiogram.fsm.context import FSMContext
 from aiogram.types import CallbackQuery, InaccessibleMessage, Message
@@ -15,7 +17,7 @@ from tgbot.keyboards.inline import (
 from tgbot.misc.states import (
     BroadcastState,
 )
-from tgbot.services.broadcaster import broadcast
+from tgbot.services.broadcaster import BroadcastStats, broadcast
 
 admin_router = Router()
 admin_router.message.filter(AdminFilter())
@@ -35,6 +37,12 @@ async def admin_start(update: Message | CallbackQuery, state: FSMContext):
 
 # ======================================================================================================================
 # Broadcast
+async def _delete_quietly(message: Message, message_id: int) -> None:
+    """Delete a message in the same chat, which may already be gone or too old"""
+    with suppress(TelegramBadRequest):
+        await message.bot.delete_message(message.chat.id, message_id)
+
+
 @admin_router.callback_query(F.data == "broadcast")
 async def broadcast_main(call: CallbackQuery, state: FSMContext):
     if not call.message or isinstance(call.message, InaccessibleMessage):
@@ -57,13 +65,14 @@ async def receive_broadcast_data(message: Message, state: FSMContext):
     if message.photo:
         file_id = message.photo[-1].file_id
         await state.update_data(photo=file_id, text=message.caption)
-        await asyncio.sleep(2)
-        await message.bot.delete_message(message.chat.id, msg_to_edit)
-        await message.answer_photo(
-            photo=file_id,
-            caption=f"{message.caption}\n\n"
-            f"<b>Is everything correct? Start broadcast?</b>",
-            reply_markup=choose_menu,
+        await asyncio.gather(
+            _delete_quietly(message, msg_to_edit),
+            message.answer_photo(
+                photo=file_id,
+                caption=f"{message.caption}\n\n"
+                f"<b>Is everything correct? Start broadcast?</b>",
+                reply_markup=choose_menu,
+            ),
         )
     else:
         if not message.text:
@@ -99,11 +108,35 @@ async def agree_and_start(call: CallbackQuery, state: FSMContext, bot):
     )
     await state.clear()
     await call.message.delete()
-    users = await AsyncORM.users.get_all()
+    users = await AsyncORM.users.get_all_ids()
     to_delete: Message = await call.message.answer("<b>Broadcast started</b>")
-    done = await broadcast(
-        bot, users, text, photo_name, disable_notification=silent_mode
-    )
+
+    async def show_progress(stats: BroadcastStats):
+        await to_delete.edit_text(
+            f"<b>Broadcast in progress</b>\n"
+            f"Processed: <code>{stats.processed}/{len(users)}</>\n"
+            f"Received the message: <code>{stats.success}</>"
+        )
+
+    try:
+        done = await broadcast(
+            bot,
+            users,
+            text,
+            photo_name,
+            disable_notification=silent_mode,
+            on_blocked=AsyncORM.users.mark_blocked,
+            on_progress=show_progress,
+        )
+    except TelegramBadRequest as e:
+        await to_delete.delete()
+        await call.message.answer(
+            f"<b>Broadcast stopped</b>\n"
+            f"Telegram rejected the message: <code>{html.quote(e.message)}</>\n",
+            reply_markup=back_admin,
+        )
+        return
+
     await to_delete.delete()
     await call.message.answer(
         f"<b>Broadcast done</b>\n" f"Received the message: <code>{done}</>\n",
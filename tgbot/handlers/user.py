@@ -1,5 +1,3 @@
-from functools import partial
-from typing import Callable
 from aiogram import F, Router
 from aiogram.filters import CommandStart
 from aiogram.fsm.context import FSMContext
@@ -45,7 +43,7 @@ async def support_handler(message: Message):
 @user_router.callback_query(F.data == "personal_acc")
 @user_router.message(F.text == "👤Profile")
 async def personal_acc_handler(event: Message | CallbackQuery):
-    send_method: Callable = partial(
+    send_method = (
         event.message.edit_text if isinstance(event, CallbackQuery) else event.answer
     )
     await send_method(
@@ -48,3 +48,7 @@ choose_menu = InlineKeyboardMarkup(
         [InlineKeyboardButton(text="🔙Back", callback_data="back_admin")],
     ]
 )
+
+
+# Module-level markups never change, so the bot session serializes them only once
+static_markups = (admin_menu, support_menu, back_admin, choose_menu)
@@ -1,32 +1,40 @@
 from typing import Callable, Dict, Any, Awaitable
 
 from aiogram import BaseMiddleware
-from aiogram.types import CallbackQuery, Message, TelegramObject
+from aiogram.types import TelegramObject, User
 
 from tgbot.database.orm import AsyncORM
+from tgbot.middlewares.utils import get_event_user
+
+# Other updates (chat member changes, inline queries...) don't need a users row
+HANDLED_EVENTS = {"message", "callback_query"}
 
 
 class DatabaseMiddleware(BaseMiddleware):
     async def __call__(
         self,
         handler: Callable[[TelegramObject, Dict[str, Any]], Awaitable[Any]],
-        event: Message | CallbackQuery,
+        event: TelegramObject,
         data: Dict[str, Any],
     ) -> Any:
-        if not event.from_user:
-            return
+        from_user: User | None = get_event_user(event, data, HANDLED_EVENTS)
+        if not from_user:
+            return await handler(event, data)
 
-        user = await AsyncORM.users.get(event.from_user.id)
+        user = await AsyncORM.users.get(from_user.id)
         if not user:
             user = await AsyncORM.users.create(
-                id=event.from_user.id,
-                username=event.from_user.username,
+                id=from_user.id,
+                username=from_user.username,
             )
 
-        if user and event.from_user.username != user.username:
-            user = await AsyncORM.users.update(
-                user.id, username=event.from_user.username
-            )
+        if user and (from_user.username != user.username or user.blocked):
+            values = {"username": from_user.username}
+            # A blocked user writing to the bot again means they unblocked it.
+            # Only send the flag then, it invalidates the cached user ids
+            if user.blocked:
+                values["blocked"] = False
+            user = await AsyncORM.users.update(user.id, **values)
 
         data["user"] = user
         result = await handler(event, data)
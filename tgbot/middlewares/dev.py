@@ -1,23 +1,26 @@
 from typing import Callable, Dict, Any, Awaitable
 
 from aiogram import BaseMiddleware
-from aiogram.types import CallbackQuery, Message, TelegramObject
+from aiogram.types import TelegramObject, User
 
 from tgbot.config import Config
+from tgbot.middlewares.utils import get_event_user
 
 
 class DeveloperMiddleware(BaseMiddleware):
     async def __call__(
         self,
         handler: Callable[[TelegramObject, Dict[str, Any]], Awaitable[Any]],
-        event: Message | CallbackQuery,
+        event: TelegramObject,
         data: Dict[str, Any],
     ) -> Any:
-        if not event.from_user:
-            return
+        # Every update with a sender is gated, not only messages and callbacks
+        from_user: User | None = get_event_user(event, data)
+        if not from_user:
+            return await handler(event, data)
 
         config: Config = data["config"]
-        if config.misc.dev and event.from_user.id not in config.tg_bot.admin_ids:
+        if config.misc.dev and from_user.id not in config.tg_bot.admin_ids:
             return
 
         result = await handler(event, data)
@@ -0,0 +1,22 @@
+from typing import Any, Collection, Dict, Optional
+
+from aiogram.types import TelegramObject, Update, User
+
+
+def get_event_user(
+    event: TelegramObject,
+    data: Dict[str, Any],
+    event_types: Optional[Collection[str]] = None,
+) -> Optional[User]:
+    """
+    Sender of an update seen by an outer update middleware
+
+    :param event_types: only these update types (e.g. "message") count, None for all.
+    :return: the sender, or None if the update has none or is of another type.
+    """
+    if event_types is not None and (
+        not isinstance(event, Update) or event.event_type not in event_types
+    ):
+        return None
+    # Set by aiogram's UserContextMiddleware, which runs before ours on updates
+    return data.get("event_from_user")
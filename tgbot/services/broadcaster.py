@@ -1,12 +1,145 @@
 import asyncio
 import logging
-from typing import List, Optional, Union
+import random
+import time
+from collections import OrderedDict
+from contextlib import aclosing, nullcontext
+from dataclasses import dataclass
+from typing import (
+    Any,
+    AsyncIterable,
+    AsyncIterator,
+    Awaitable,
+    Callable,
+    Iterable,
+    List,
+    Optional,
+    Union,
+)
 
 from aiogram import Bot
 from aiogram import exceptions
+from aiogram.client.session.aiohttp import AiohttpSession
+from aiogram.methods import CopyMessage, SendMessage, SendPhoto
 from aiogram.types import InlineKeyboardMarkup
+from aiolimiter import AsyncLimiter
 
 from tgbot.database.models import User
+from tgbot.services.session import CachedMarkupSession
+
+# Telegram allows ~30 messages per second per bot and 20 per minute per group
+_global_limiter = AsyncLimiter(29, 1.0)
+# Least recently used group limiters, evicted past _MAX_GROUP_LIMITERS chats
+_group_limiters: OrderedDict[int, AsyncLimiter] = OrderedDict()
+_MAX_GROUP_LIMITERS = 1000
+# time.monotonic() until which every sender holds off after a flood-wait
+_flood_until = 0.0
+
+
+@dataclass
+class BroadcastStats:
+    """Outcome counters of a broadcast, logged once when it ends"""
+
+    success: int = 0
+    forbidden: int = 0
+    bad_request: int = 0
+    flood_waits: int = 0
+    failed: int = 0
+
+    @property
+    def processed(self) -> int:
+        """Recipients done with, successfully or not"""
+        return self.success + self.forbidden + self.bad_request + self.failed
+
+
+def _group_limiter(chat_id: Union[int, str]) -> Optional[AsyncLimiter]:
+    """Per-chat limiter for groups and channels (negative ids), None for private chats"""
+    if not isinstance(chat_id, int) or chat_id >= 0:
+        return None
+    limiter = _group_limiters.get(chat_id)
+    if limiter is None:
+        limiter = _group_limiters[chat_id] = AsyncLimiter(20, 60.0)
+        if len(_group_limiters) > _MAX_GROUP_LIMITERS:
+            _group_limiters.popitem(last=False)
+    else:
+        _group_limiters.move_to_end(chat_id)
+    return limiter
+
+
+async def send_method(
+    bot: Bot,
+    method: Union[SendMessage, SendPhoto, CopyMessage],
+    max_retries: int = 3,
+    on_blocked: Optional[Callable[[int], Any]] = None,
+    stats: Optional[BroadcastStats] = None,
+) -> bool:
+    """
+    Safe sender for an already built send method
+
+    :param bot: Bot instance.
+    :param method: SendMessage/SendPhoto/CopyMessage with chat_id set.
+    :param max_retries: how many times to retry after a flood-wait.
+    :param on_blocked: called with the chat id if the user blocked the bot
+        or the chat no longer exists.
+    :param stats: counters to update instead of logging every outcome.
+    :return: success.
+    :raises TelegramBadRequest: if the request itself is invalid (bad markup, text too
+        long...), since it would fail the same way for every other recipient.
+    """
+    stats = stats or BroadcastStats()
+    debug = logging.getLogger().isEnabledFor(logging.DEBUG)
+    user_id = method.chat_id
+    group_limiter = _group_limiter(user_id)
+    global _flood_until
+    for attempt in range(max_retries + 1):
+        # Another send already hit a flood-wait, don't hammer Telegram meanwhile
+        pause = _flood_until - time.monotonic()
+        if pause > 0:
+            await asyncio.sleep(pause)
+        try:
+            if group_limiter:
+                await group_limiter.acquire()
+            async with _global_limiter:
+                await bot(method)
+        except exceptions.TelegramBadRequest as e:
+            if "chat not found" not in e.message:
+                raise
+            stats.bad_request += 1
+            if debug:
+                logging.debug("Target [ID:%s]: Bad Request: %s", user_id, e.message)
+            if on_blocked:
+                on_blocked(user_id)
+        except exceptions.TelegramForbiddenError:
+            stats.forbidden += 1
+            if debug:
+                logging.debug("Target [ID:%s]: got TelegramForbiddenError", user_id)
+            if on_blocked:
+                on_blocked(user_id)
+        except exceptions.TelegramRetryAfter as e:
+            stats.flood_waits += 1
+            # Jitter so concurrent senders don't all retry at the same instant
+            delay = e.retry_after * (1 + random.random() * 0.1) + random.uniform(0, 0.5)
+            _flood_until = max(_flood_until, time.monotonic() + delay)
+            logging.warning(
+                "Target [ID:%s]: Flood limit is exceeded. Sleep %.2f seconds.",
+                user_id,
+                delay,
+            )
+            # Other senders still honour _flood_until, but there is no retry to wait for
+            if attempt < max_retries:
+                await asyncio.sleep(delay)
+            continue
+        except exceptions.TelegramAPIError:
+            stats.failed += 1
+            logging.exception("Target [ID:%s]: failed", user_id)
+        else:
+            stats.success += 1
+            return True
+        return False
+
+    stats.failed += 1
+    logging.error("Target [ID:%s]: gave up after %s retries", user_id, max_retries)
+    return False
 
 
 async def send_message(
@@ -15,78 +148,211 @@ async def send_message(
     text: str,
     disable_notification: bool = False,
     reply_markup: Optional[InlineKeyboardMarkup] = None,
+    max_retries: int = 3,
 ) -> bool:
     """
-    Safe messages sender
+    Messages sender that handles blocked users and flood-waits
 
     :param bot: Bot instance.
     :param user_id: user id. If str - must contain only digits.
     :param text: text of the message.
     :param disable_notification: disable notification or not.
     :param reply_markup: reply markup.
+    :param max_retries: how many times to retry after a flood-wait.
     :return: success.
+    :raises TelegramBadRequest: if the message itself is invalid (bad markup, text too
+        long...), see `send_method`.
     """
-    try:
-        await bot.send_message(
-            user_id,
-            text,
+    return await send_method(
+        bot,
+        SendMessage(
+            chat_id=user_id,
+            text=text,
             disable_notification=disable_notification,
             reply_markup=reply_markup,
-        )
-    except exceptions.TelegramBadRequest as e:
-        logging.error("Telegram server says - Bad Request: chat not found")
-    except exceptions.TelegramForbiddenError:
-        logging.error(f"Target [ID:{user_id}]: got TelegramForbiddenError")
-    except exceptions.TelegramRetryAfter as e:
-        logging.error(
-            f"Target [ID:{user_id}]: Flood limit is exceeded. Sleep {e.retry_after} seconds."
-        )
-        await asyncio.sleep(e.retry_after)
-        return await send_message(
-            bot, user_id, text, disable_notification, reply_markup
-        )  # Recursive call
-    except exceptions.TelegramAPIError:
-        logging.exception(f"Target [ID:{user_id}]: failed")
+        ),
+        max_retries,
+    )
+
+
+async def _aiter(
+    users: Union[Iterable[Union[User, int]], AsyncIterable[Union[User, int]]]
+) -> AsyncIterator[Union[User, int]]:
+    if isinstance(users, AsyncIterable):
+        # Close generators (e.g. a DB stream) as soon as the broadcast stops with them
+        closing = aclosing(users) if hasattr(users, "aclose") else nullcontext(users)
+        async with closing:
+            async for user in users:
+                yield user
     else:
-        logging.info(f"Target [ID:{user_id}]: success")
-        return True
-    return False
+        for user in users:
+            yield user
+
+
+async def _iter_user_ids(
+    users: Union[Iterable[Union[User, int]], AsyncIterable[Union[User, int]]]
+) -> AsyncIterator[int]:
+    """Yield unique chat ids in input order, unwrapping User objects and skipping invalid ids"""
+    seen: set[int] = set()
+    invalid = 0
+    async with aclosing(_aiter(users)) as source:
+        async for user in source:
+            try:
+                user_id = user.id if isinstance(user, User) else int(user)
+            except (TypeError, ValueError):
+                invalid += 1
+                continue
+            if user_id in seen:
+                continue
+            seen.add(user_id)
+            yield user_id
+
+    if invalid:
+        logging.warning("BROADCAST: skipped %s invalid user ids", invalid)
 
 
 async def broadcast(
     bot: Bot,
-    users: List[User],
+    users: Union[Iterable[Union[User, int]], AsyncIterable[Union[User, int]]],
     text: Optional[str] = "",
     photo_id: Optional[str] = None,
     disable_notification: bool = False,
     reply_markup: Optional[InlineKeyboardMarkup] = None,
+    concurrency: int = 25,
+    max_retries: int = 3,
+    on_blocked: Optional[Callable[[List[int]], Awaitable[Any]]] = None,
+    from_chat_id: Optional[int] = None,
+    message_id: Optional[int] = None,
+    on_progress: Optional[Callable[[BroadcastStats], Awaitable[Any]]] = None,
+    progress_every: int = 100,
+    channel_id: Optional[int] = None,
 ) -> int:
-    count = 0
-    try:
-        for user in users:
-            if not photo_id:
-                if await send_message(
-                    bot,
-                    user.id if isinstance(user, User) else user,
-                    text,
-                    disable_notification,
-                    reply_markup,
-                ):
-                    count += 1
-            else:
+    """
+    Send a message to every user with a pool of `concurrency` worker tasks
+
+    :param users: list of users or ids, or an async iterator of them (e.g. a DB stream).
+        Sending starts as soon as the first user arrives.
+    :param on_blocked: awaited once at the end with the ids of users that blocked the bot.
+    :param from_chat_id: with `message_id`, copy this existing message instead of sending
+        `text`/`photo_id`; media is then referenced server-side, not re-sent.
+    :param message_id: id of the message to copy from `from_chat_id`.
+    :param on_progress: awaited with the running stats every `progress_every` recipients.
+        A `progress_every` below 1 turns the reports off.
+    :param channel_id: post once to this channel instead of messaging users one by one.
+        Telegram fans it out server-side, so only channel subscribers receive it
+        and `users` is ignored.
+    :return: number of successfully sent messages (1 or 0 in channel mode).
+    :raises TelegramBadRequest: if Telegram rejects the message itself (not because of
+        the recipient); the broadcast stops early instead of failing once per user.
+    """
+    # Bounded buffer between the user source and the workers, so memory stays
+    # O(concurrency) whatever the number of users
+    queue: asyncio.Queue[Optional[int]] = asyncio.Queue(maxsize=concurrency * 4)
+    blocked_ids: List[int] = []
+    stats = BroadcastStats()
+
+    # Validate the request once, then only swap chat_id for every recipient
+    if from_chat_id is not None and message_id is not None:
+        template = CopyMessage(
+            chat_id=0,
+            from_chat_id=from_chat_id,
+            message_id=message_id,
+            disable_notification=disable_notification,
+            reply_markup=reply_markup,
+        )
+    elif photo_id:
+        template = SendPhoto(
+            chat_id=0,
+            photo=photo_id,
+            caption=text,
+            disable_notification=disable_notification,
+            reply_markup=reply_markup,
+        )
+    else:
+        template = SendMessage(
+            chat_id=0,
+            text=text,
+            disable_notification=disable_notification,
+            reply_markup=reply_markup,
+        )
+
+    if channel_id is not None:
+        method = template.model_copy(update={"chat_id": channel_id})
+        try:
+            sent = await send_method(bot, method, max_retries)
+        except exceptions.TelegramBadRequest as e:
+            logging.error(
+                "BROADCAST: stopped, Telegram rejects the message: %s", e.message
+            )
+            raise
+        logging.info("BROADCAST: channel post to %s sent: %s", channel_id, sent)
+        return int(sent)
+
+    report_progress = on_progress is not None and progress_every >= 1
+
+    async def worker() -> None:
+        while (user_id := await queue.get()) is not None:
+            method = template.model_copy(update={"chat_id": user_id})
+            await send_method(bot, method, max_retries, blocked_ids.append, stats)
+            if report_progress and stats.processed % progress_every == 0:
+                # A failing progress report must never stop the sends
+                try:
+                    await on_progress(stats)
+                except Exception:
+                    logging.exception("BROADCAST: progress callback failed")
+
+    # The same markup goes to every user, serialize it once instead of per send
+    markup_cache = (
+        bot.session.cached_markup(reply_markup)
+        if reply_markup and isinstance(bot.session, CachedMarkupSession)
+        else nullcontext()
+    )
+
+    # Open the bot's HTTP session before the fan-out, so every send reuses its
+    # keep-alive pool instead of the first concurrent sends racing to create it
+    if isinstance(bot.session, AiohttpSession):
+        await bot.session.create_session()
+
+    async def produce() -> None:
+        async with aclosing(_iter_user_ids(users)) as user_ids:
+            async for user_id in user_ids:
+                await queue.put(user_id)
+        for _ in range(concurrency):
+            await queue.put(None)
+
+    with markup_cache:
+        try:
+            # A failing or cancelled task cancels the rest, nothing is left orphaned
+            async with asyncio.TaskGroup() as tg:
+                tg.create_task(produce())
+                for _ in range(concurrency):
+                    tg.create_task(worker())
+        except* exceptions.TelegramBadRequest as e:
+            logging.error(
+                "BROADCAST: stopped, Telegram rejects the message: %s",
+                e.exceptions[0].message,
+            )
+            raise e.exceptions[0]
+        except* Exception as e:
+            logging.error(
+                "BROADCAST: aborted with %s error(s)", len(e.exceptions), exc_info=e
+            )
+            raise
+        finally:
+            logging.info(
+                "BROADCAST: %s messages successful sent. "
+                "Forbidden: %s, bad request: %s, flood waits: %s, failed: %s",
+                stats.success,
+                stats.forbidden,
+                stats.bad_request,
+                stats.flood_waits,
+                stats.failed,
+            )
+            if on_blocked and blocked_ids:
+                # Failed bookkeeping must not hide the outcome of the broadcast
                 try:
-                    await bot.send_photo(
-                        user.id if isinstance(user, User) else user,
-                        photo=photo_id,
-                        caption=text,
-                        disable_notification=disable_notification,
-                        reply_markup=reply_markup,
-                    )
-                    count += 1
+                    await on_blocked(blocked_ids)
                 except Exception:
-                    pass
-            await asyncio.sleep(0.05)
-    finally:
-        logging.info(f"BROADCAST: {count} messages successful sent.")
+                    logging.exception("BROADCAST: on_blocked callback failed")
 
-    return count
+    return stats.success
@@ -0,0 +1,55 @@
+from contextlib import contextmanager
+from typing import Any, Iterable, Iterator
+
+from aiogram import Bot
+from aiogram.client.session.aiohttp import AiohttpSession
+from aiogram.methods import TelegramMethod
+from aiogram.types import TelegramObject
+from aiohttp import FormData
+
+
+class CachedMarkupSession(AiohttpSession):
+    """
+    AiohttpSession that sends pre-serialized JSON for static reply markups
+
+    :param static_markups: markups that are reused as is (module-level keyboards).
+        They are serialized once here instead of on every request.
+    """
+
+    def __init__(
+        self, static_markups: Iterable[TelegramObject] = (), **kwargs: Any
+    ) -> None:
+        super().__init__(**kwargs)
+        self._serialized_markups = {
+            id(markup): (markup, markup.model_dump_json(exclude_none=True))
+            for markup in static_markups
+        }
+
+    @contextmanager
+    def cached_markup(self, markup: TelegramObject) -> Iterator[None]:
+        """Serialize `markup` once and reuse it until the block exits (e.g. a broadcast)"""
+        key = id(markup)
+        if key in self._serialized_markups:
+            yield
+            return
+
+        self._serialized_markups[key] = (
+            markup,
+            markup.model_dump_json(exclude_none=True),
+        )
+        try:
+            yield
+        finally:
+            del self._serialized_markups[key]
+
+    def build_form_data(self, bot: Bot, method: TelegramMethod) -> FormData:
+        markup = getattr(method, "reply_markup", None)
+        cached = self._serialized_markups.get(id(markup))
+        if cached is None or cached[0] is not markup:
+            return super().build_form_data(bot, method)
+
+        form = super().build_form_data(
+            bot, method.model_copy(update={"reply_markup": None})
+        )
+        form.add_field("reply_markup", cached[1])
+        return form